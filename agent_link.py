@@ -0,0 +1,154 @@
+"""
+Shared memory link between a game and external agent processes.
+
+The game publishes its telemetry() values every tick into an observation
+ring buffer, and reads the keys an agent holds down from an action ring
+buffer. Actions are key bits in the same order as the first telemetry value.
+"""
+
+import sys
+import struct
+
+HEADER = struct.Struct("<QII") # last written sequence, slots, values per slot
+SLOT = struct.Struct("<QII") # sequence, tick, value count
+
+class RingBuffer(object):
+	"""
+	This class is a single writer ring buffer of int32 records in shared
+	memory. Each slot carries the sequence number it was written with, which
+	is cleared while the slot is being rewritten, so readers can tell when a
+	read was torn and retry.
+	"""
+	def __init__(self, name, slots=64, values=1024, create=False):
+		# Imported here so the games still run on Python older than 3.8,
+		# as long as --agent isn't used.
+		from multiprocessing import resource_tracker, shared_memory
+
+		if create:
+			size = HEADER.size + slots * (SLOT.size + 4 * values)
+			self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+			HEADER.pack_into(self.shm.buf, 0, 0, slots, values)
+		else:
+			self.shm = shared_memory.SharedMemory(name=name)
+			# Only the creator should unlink the segment at exit.
+			resource_tracker.unregister(self.shm._name, "shared_memory")
+		self.owner = create
+		self.seq, self.slots, self.values = HEADER.unpack_from(self.shm.buf, 0)
+		self.slot_size = SLOT.size + 4 * self.values
+		self.ints = self.shm.buf.cast("i")
+
+	def offset(self, seq):
+		return HEADER.size + (seq % self.slots) * self.slot_size
+
+	def write(self, tick, values):
+		"""
+		Writes a record and returns its sequence number. Values past the slot
+		size are dropped.
+		"""
+		self.seq += 1
+		offset = self.offset(self.seq)
+		count = min(len(values), self.values)
+		buf = self.shm.buf
+		SLOT.pack_into(buf, offset, 0, tick, count)
+		# Native byte order, to match the int view readers get.
+		struct.pack_into("=%di" % count, buf, offset + SLOT.size, *values[:count])
+		SLOT.pack_into(buf, offset, self.seq, tick, count)
+		struct.pack_into("<Q", buf, 0, self.seq)
+		return self.seq
+
+	def latest(self):
+		return struct.unpack_from("<Q", self.shm.buf, 0)[0]
+
+	def view(self, seq):
+		"""
+		Returns (tick, values) for seq without copying, or None if the slot
+		no longer holds it. The values can change under the reader once the
+		writer wraps around, so check valid(seq) after using them.
+		"""
+		offset = self.offset(seq)
+		slot_seq, tick, count = SLOT.unpack_from(self.shm.buf, offset)
+		if slot_seq != seq:
+			return None
+		start = (offset + SLOT.size) // 4
+		return tick, self.ints[start:start + count]
+
+	def valid(self, seq):
+		return struct.unpack_from("<Q", self.shm.buf, self.offset(seq))[0] == seq
+
+	def read(self, seq=None):
+		"""
+		Returns a copy of (seq, tick, values) for seq, or for the latest
+		record if seq is None. Returns None if there is nothing to read.
+		"""
+		while True:
+			target = self.latest() if seq is None else seq
+			if target == 0:
+				return None
+			record = self.view(target)
+			if record is not None:
+				tick, values = record
+				values = tuple(values)
+				if self.valid(target):
+					return target, tick, values
+			if seq is not None:
+				return None
+
+	def close(self):
+		self.ints.release()
+		self.shm.close()
+		if self.owner:
+			self.shm.unlink()
+
+class ActionKeys(object):
+	"""
+	This class looks like pg.key.get_pressed(), with the keys held by the
+	agent added to the ones held on the keyboard.
+	"""
+	def __init__(self, keys, bits, codes):
+		self.keys = keys.keys if isinstance(keys, ActionKeys) else keys
+		self.held = set(code for i, code in enumerate(codes) if bits & (1 << i))
+
+	def __getitem__(self, key):
+		return key in self.held or self.keys[key]
+
+class AgentLink(object):
+	"""
+	This class is the pair of ring buffers named NAME_obs and NAME_act. The
+	game creates them; agents attach with create=False, read observations and
+	write actions.
+	"""
+	def __init__(self, name, create=False, slots=64, values=1024):
+		self.observations = RingBuffer(name + "_obs", slots, values, create)
+		try:
+			self.actions = RingBuffer(name + "_act", slots, 1, create)
+		except Exception:
+			self.observations.close()
+			raise
+
+	def publish(self, tick, values):
+		return self.observations.write(tick, values)
+
+	def observe(self, seq=None):
+		return self.observations.read(seq)
+
+	def act(self, tick, bits):
+		return self.actions.write(tick, (bits,))
+
+	def keys(self, keys, codes):
+		record = self.actions.read()
+		bits = record[2][0] if record is not None else 0
+		return ActionKeys(keys, bits, codes)
+
+	def close(self):
+		self.observations.close()
+		self.actions.close()
+
+def open_link(argv=None):
+	"""
+	Returns an AgentLink created for "--agent NAME" on the command line, or
+	None.
+	"""
+	argv = sys.argv[1:] if argv is None else argv
+	if "--agent" in argv[:-1]:
+		return AgentLink(argv[argv.index("--agent") + 1], create=True)
+	return None
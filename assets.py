@@ -0,0 +1,143 @@
+"""
+Shared asset cache with a thread pool preloader.
+"""
+
+import pygame as pg
+
+def make_solid(size, color):
+	image = pg.Surface(size, pg.SRCALPHA)
+	image.fill(color)
+	return image
+
+class AssetManager(object):
+	"""
+	This class caches surfaces, fonts and rendered text by key. Assets can
+	be declared up front and built by load() on a thread pool before the
+	first frame; anything not declared is built on first use instead.
+	convert_alpha() needs the display, so it always runs on the main thread.
+	"""
+	def __init__(self):
+		self.builders = dict()
+		self.assets = dict()
+		self.registered = False
+
+	def clear(self):
+		# Fonts are invalid after pg.quit(), so the cache is dropped with it.
+		self.assets = dict()
+		self.registered = False
+
+	def store(self, key, asset, convert):
+		if not self.registered:
+			pg.register_quit(self.clear)
+			self.registered = True
+		if convert:
+			asset = asset.convert_alpha()
+		self.assets[key] = asset
+		return asset
+
+	def declare(self, key, build, convert=True):
+		if key not in self.assets:
+			self.builders[key] = (build, convert)
+
+	def get(self, key, build=None, convert=True):
+		asset = self.assets.get(key)
+		if asset is None:
+			if key in self.builders:
+				build, convert = self.builders.pop(key)
+			asset = self.store(key, build(), convert)
+		return asset
+
+	def solid_key(self, size, color):
+		return ("solid", tuple(size), tuple(pg.Color(color)))
+
+	def declare_solid(self, size, color):
+		self.declare(self.solid_key(size, color), lambda: make_solid(size, color))
+
+	def solid(self, size, color):
+		return self.get(self.solid_key(size, color), lambda: make_solid(size, color))
+
+	def declare_font(self, name, size):
+		self.declare(("font", name, size), lambda: pg.font.SysFont(name, size), False)
+
+	def font(self, name, size):
+		return self.get(("font", name, size), lambda: pg.font.SysFont(name, size), False)
+
+	def text_key(self, name, size, text, color):
+		return ("text", name, size, text, tuple(pg.Color(color)))
+
+	def declare_text(self, name, size, text, color):
+		self.declare_font(name, size)
+		self.declare(self.text_key(name, size, text, color),
+			lambda: self.font(name, size).render(text, 1, color), False)
+
+	def text(self, name, size, text, color):
+		return self.get(self.text_key(name, size, text, color),
+			lambda: self.font(name, size).render(text, 1, color), False)
+
+	def build(self, items):
+		# Runs on a worker thread; returns the unconverted assets.
+		return [(key, build(), convert) for key, (build, convert) in items]
+
+	def build_texts(self, font_key, font_future, items):
+		# A font object must not render from two threads at once, so all
+		# texts of one font are rendered in a single task.
+		if font_future is not None:
+			font = font_future.result()[0][1]
+		else:
+			font = self.assets[font_key]
+		results = list()
+		for key, (build, convert) in items:
+			name, size, text, color = key[1:]
+			results.append((key, font.render(text, 1, color), convert))
+		return results
+
+	def build_all(self, pending, workers):
+		# Yields lists of built assets as they become ready.
+		try:
+			from concurrent.futures import ThreadPoolExecutor, as_completed
+		except ImportError:
+			# Python 2 has no concurrent.futures; build on this thread,
+			# storing fonts before the texts that use them are built.
+			for item in sorted(pending.items(), key=lambda item: item[0][0] != "font"):
+				yield self.build([item])
+			return
+
+		with ThreadPoolExecutor(workers) as pool:
+			futures = list()
+			font_futures = dict()
+			texts = dict()
+			# Fonts are submitted before the text tasks that wait on them.
+			for key, item in pending.items():
+				if key[0] == "font":
+					font_futures[key] = pool.submit(self.build, [(key, item)])
+					futures.append(font_futures[key])
+				elif key[0] == "text":
+					texts.setdefault(("font",) + key[1:3], list()).append((key, item))
+				else:
+					futures.append(pool.submit(self.build, [(key, item)]))
+			for font_key, items in texts.items():
+				if font_key not in font_futures:
+					self.font(*font_key[1:])
+				futures.append(pool.submit(self.build_texts, font_key, font_futures.get(font_key), items))
+
+			for future in as_completed(futures):
+				yield future.result()
+
+	def load(self, progress=None, workers=4):
+		"""
+		Builds everything declared so far and calls progress(done, total) on
+		the calling thread as assets become ready.
+		"""
+		pending = self.builders
+		self.builders = dict()
+		total = len(pending)
+		done = 0
+
+		for results in self.build_all(pending, workers):
+			for key, asset, convert in results:
+				self.store(key, asset, convert)
+				done += 1
+				if progress is not None:
+					progress(done, total)
+
+ASSETS = AssetManager()
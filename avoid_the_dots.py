@@ -2,18 +2,25 @@
 Avoid the red dots.
 """
 
-import os
-import sys
 import math
 import random
+import struct
 import pygame as pg
 
+from assets import ASSETS
+from render_queue import QUIT_EVENTS, RenderQueue
+from replay_log import key_bits
+from game_runner import publish, run
+
 SCREEN_SIZE = (1280, 720)
 TRANSPARENT = (0, 0, 0, 0)
 DIRECTION = {
 	pg.K_LEFT: (-1, 0),
 	pg.K_RIGHT: (1, 0)
 }
+SNAPSHOT = struct.Struct("<Iddiiii?H") # tick, counters, player, obstacle count
+OBSTACLE_SNAPSHOT = struct.Struct("<4i")
+PARTICLE_SNAPSHOT = struct.Struct("<2i3d")
 
 class Obstacle(object):
 	SIZE = (10, 10)
@@ -26,11 +33,7 @@ class Obstacle(object):
 		self.has_collided = True
 		
 	def make_image(self):
-		image = pg.Surface(self.rect.size).convert_alpha()
-		image.fill(TRANSPARENT)
-		image_rect = image.get_rect()
-		pg.draw.rect(image, pg.Color("red"), pg.Rect((0, 0), Obstacle.SIZE))
-		return image
+		return ASSETS.solid(self.rect.size, "red")
 
 	def update(self):
 		self.rect.y += self.direction * self.speed
@@ -49,15 +52,28 @@ class Player(object):
 		self.max_health = 100
 		self.health = self.max_health
 		self.dead = False
+		self.frames = self.make_frames()
 		self.image = self.make_image()
 		self.explosion = Explosion(pos, 36, 5, 5)
 
+	@staticmethod
+	def make_strip(max_health):
+		# One frame per health level, drawn side by side into a single strip
+		# so health changes don't allocate a new surface.
+		width, height = Player.SIZE
+		strip = pg.Surface((width * (max_health + 1), height), pg.SRCALPHA)
+		strip.fill(pg.Color("red"))
+		for health in range(max_health + 1):
+			pg.draw.rect(strip, pg.Color("white"), pg.Rect((health * width, height - ((float(health)/float(max_health))*height)), Player.SIZE))
+		return strip
+
+	def make_frames(self):
+		strip = ASSETS.get(("player", self.max_health), lambda: Player.make_strip(self.max_health))
+		width = Player.SIZE[0]
+		return [strip.subsurface(pg.Rect((health * width, 0), Player.SIZE)) for health in range(self.max_health + 1)]
+
 	def make_image(self):
-		image = pg.Surface(self.rect.size).convert_alpha()
-		image.fill(pg.Color("red"))
-		image_rect = image.get_rect()
-		pg.draw.rect(image, pg.Color("white"), pg.Rect((0, Player.SIZE[1] - ((float(self.health)/float(self.max_health))*Player.SIZE[1])), Player.SIZE))
-		return image
+		return self.frames[min(max(self.health, 0), self.max_health)]
 
 	def setHealth(self, amount):
 		self.health = amount
@@ -101,9 +117,7 @@ class Particle(object):
 		self.rect.center = pos
 
 	def make_image(self):
-		image = pg.Surface(self.rect.size).convert_alpha()
-		image.fill((255, 0, 0, int(self.opacity)))
-		return image
+		return ASSETS.solid(self.rect.size, (255, 0, 0, int(self.opacity)))
 
 	def update(self):
 		#self.size -= self.dcy
@@ -125,6 +139,7 @@ class Explosion(object):
 	def __init__(self, pos, particles, power, psize):
 		self.rect = pg.Rect((0, 0), (power, power))
 		self.rect.center = pos
+		self.stride = 1 # draw every nth particle
 		self.particles = list()
 		for i in range(particles):
 			angle = (float(i) / float(particles)) * math.pi * 2
@@ -137,12 +152,21 @@ class Explosion(object):
 		for p in self.particles:
 			p.update()
 
+	def blits(self):
+		return [(p.make_image(), p.rect) for p in self.particles[::self.stride]]
+
 	def draw(self, surface):
-		for p in self.particles:
+		for p in self.particles[::self.stride]:
 			p.draw(surface)
 
+def declare_assets():
+	ASSETS.declare_solid(Obstacle.SIZE, "red")
+	ASSETS.declare(("player", 100), lambda: Player.make_strip(100))
+	for opacity in range(256):
+		ASSETS.declare_solid((5, 5), (255, 0, 0, opacity))
+
 class App(object):
-	def __init__(self):
+	def __init__(self, render_queue=None, log=None, link=None):
 		self.screen = pg.display.get_surface()
 		self.screen_rect = self.screen.get_rect()
 		self.clock = pg.time.Clock()
@@ -155,6 +179,11 @@ class App(object):
 		self.regen_interval = 1
 		self.spawn_counter = self.spawn_interval * self.fps
 		self.regen_counter = self.regen_interval * self.fps
+		self.render_queue = render_queue if render_queue is not None else RenderQueue()
+		self.log = log
+		self.link = link
+		self.tick = 0
+		self.detail = 0
 
 	def spawn_obstacle(self, speed):
 		pos = random.randrange(0, SCREEN_SIZE[0])
@@ -170,50 +199,113 @@ class App(object):
 				self.obstacles.remove(o)
 				self.player.setHealth(self.player.health - 10)
 
+	def telemetry(self):
+		values = [key_bits(self.keys, DIRECTION), self.player.rect.x, self.player.acceleration, self.player.health]
+		for o in self.obstacles:
+			values.append(o.rect.x)
+			values.append(o.rect.y)
+		return values
+
+	def snapshot(self):
+		"""
+		Returns the game state as bytes for restore(). Input and the state of
+		the random module are not included.
+		"""
+		p = self.player
+		data = [SNAPSHOT.pack(self.tick, self.spawn_counter, self.regen_counter,
+			p.rect.x, p.rect.y, p.acceleration, p.health, p.dead, len(self.obstacles))]
+		for o in self.obstacles:
+			data.append(OBSTACLE_SNAPSHOT.pack(o.rect.x, o.rect.y, o.direction, o.speed))
+		if p.dead:
+			# The explosion only moves once the player is dead.
+			for q in p.explosion.particles:
+				data.append(PARTICLE_SNAPSHOT.pack(q.rect.x, q.rect.y, q.vel[0], q.vel[1], q.opacity))
+		return b"".join(data)
+
+	def restore(self, data):
+		values = SNAPSHOT.unpack_from(data)
+		self.tick, self.spawn_counter, self.regen_counter = values[:3]
+
+		p = self.player
+		p.rect.topleft = values[3:5]
+		p.acceleration = values[5]
+		if p.health != values[6]:
+			p.health = values[6]
+			p.image = p.make_image()
+		if p.dead and not values[7]:
+			p.explosion = Explosion(self.screen_rect.center, 36, 5, 5)
+			p.explosion.stride = self.detail + 1
+		p.dead = values[7]
+
+		offset = SNAPSHOT.size
+		obstacles = list()
+		for i in range(values[8]):
+			x, y, direction, speed = OBSTACLE_SNAPSHOT.unpack_from(data, offset)
+			o = self.obstacles[i] if i < len(self.obstacles) else Obstacle((0, 0), direction, speed)
+			o.rect.topleft = (x, y)
+			o.direction = direction
+			o.speed = speed
+			obstacles.append(o)
+			offset += OBSTACLE_SNAPSHOT.size
+		self.obstacles = obstacles
+
+		if p.dead:
+			for q in p.explosion.particles:
+				x, y, vx, vy, q.opacity = PARTICLE_SNAPSHOT.unpack_from(data, offset)
+				q.rect.topleft = (x, y)
+				q.vel = (vx, vy)
+				offset += PARTICLE_SNAPSHOT.size
+
+	def set_detail(self, detail):
+		self.detail = detail
+		self.player.explosion.stride = detail + 1
+
 	def event_loop(self):
 		for event in pg.event.get():
-			if event.type == pg.QUIT:
+			if event.type in QUIT_EVENTS:
 				self.done = True
 			elif event.type in (pg.KEYUP, pg.KEYDOWN):
 				self.keys = pg.key.get_pressed()
 
 	def render(self):
-		self.screen.fill(pg.Color("black"))
-		self.player.draw(self.screen)
+		self.render_queue.begin(self.screen, pg.Color("black"))
+		player = [(self.player.image, self.player.rect)]
+		player.extend(self.player.explosion.blits())
+		self.render_queue.add(player)
+		self.render_queue.add([(o.image, o.rect) for o in self.obstacles])
+		self.render_queue.present(self.screen)
+
+	def update(self):
+		if self.link is not None:
+			self.keys = self.link.keys(self.keys, DIRECTION)
+		self.player.update(self.keys, self.screen_rect)
 		for o in self.obstacles:
-			o.draw(self.screen)
-		pg.display.update()
+			o.update()
+			self.check_collision()
+			if o.rect.y < -10 or o.rect.y > SCREEN_SIZE[1] + 10:
+				self.obstacles.remove(o)
+
+		self.spawn_counter -= 1
+		self.regen_counter -= 1
+		if self.spawn_counter < 1:
+			self.spawn_obstacle(10)
+			self.spawn_counter = self.spawn_interval * self.fps
+		if self.regen_counter < 1:
+			self.player.setHealth(self.player.health + 1)
+			self.regen_counter = self.regen_interval * self.fps
+		
+		publish(self)
+		self.tick += 1
 
 	def main_loop(self):
 		while not self.done:
 			self.event_loop()
-			self.player.update(self.keys, self.screen_rect)
-			for o in self.obstacles:
-				o.update()
-				self.check_collision()
-				if o.rect.y < -10 or o.rect.y > SCREEN_SIZE[1] + 10:
-					self.obstacles.remove(o)
-
-			self.spawn_counter -= 1
-			self.regen_counter -= 1
-			if self.spawn_counter < 1:
-				self.spawn_obstacle(10)
-				self.spawn_counter = self.spawn_interval * self.fps
-			if self.regen_counter < 1:
-				self.player.setHealth(self.player.health + 1)
-				self.regen_counter = self.regen_interval * self.fps
-			
+			self.update()
 			self.render()
 			self.clock.tick(self.fps)
 
 def main():
-	os.environ['SDL_VIDEO_CENTERED'] = '1'
-	pg.init()
-	pg.display.set_caption("Test Game")
-	pg.display.set_mode(SCREEN_SIZE)
-	App().main_loop()
-	pg.quit()
-	sys.exit()
+	run(App, "Test Game", SCREEN_SIZE, declare_assets)
 
 if __name__ == "__main__":
 	main()
@@ -0,0 +1,138 @@
+"""
+Quadtree collision service shared by the games.
+"""
+
+import pygame as pg
+
+def contact_normal(a, b):
+	"""
+	Returns the unit normal of the contact between rects a and b, along the
+	axis with the least overlap and pointing from b towards a.
+	"""
+	dx = min(a.right, b.right) - max(a.left, b.left)
+	dy = min(a.bottom, b.bottom) - max(a.top, b.top)
+	if dx < dy:
+		return (1 if a.centerx >= b.centerx else -1, 0)
+	return (0, 1 if a.centery >= b.centery else -1)
+
+class QuadTree(object):
+	"""
+	This class stores items by rect. Items that don't fit entirely inside
+	one quadrant stay in the node above it.
+	"""
+	def __init__(self, bounds, max_items=8, max_depth=6, depth=0):
+		self.bounds = pg.Rect(bounds)
+		self.max_items = max_items
+		self.max_depth = max_depth
+		self.depth = depth
+		self.items = list()
+		self.rects = list()
+		self.children = None
+
+	def child_for(self, rect):
+		for child in self.children:
+			if child.bounds.contains(rect):
+				return child
+		return None
+
+	def split(self):
+		x, y = self.bounds.topleft
+		w, h = self.bounds.width // 2, self.bounds.height // 2
+		self.children = [QuadTree(r, self.max_items, self.max_depth, self.depth + 1) for r in (
+			(x, y, w, h),
+			(x + w, y, self.bounds.width - w, h),
+			(x, y + h, w, self.bounds.height - h),
+			(x + w, y + h, self.bounds.width - w, self.bounds.height - h))]
+
+		items, rects = self.items, self.rects
+		self.items, self.rects = list(), list()
+		for item, rect in zip(items, rects):
+			self.insert(item, rect)
+
+	def insert(self, item, rect):
+		if self.children is not None:
+			child = self.child_for(rect)
+			if child is not None:
+				child.insert(item, rect)
+				return
+
+		self.items.append(item)
+		self.rects.append(rect)
+		if self.children is None and len(self.items) > self.max_items and self.depth < self.max_depth:
+			self.split()
+
+	def query(self, rect, found):
+		"""
+		Appends every item whose rect overlaps rect to found.
+		"""
+		for i in rect.collidelistall(self.rects):
+			found.append(self.items[i])
+		if self.children is not None:
+			for child in self.children:
+				if child.bounds.colliderect(rect):
+					child.query(rect, found)
+		return found
+
+class CollisionWorld(object):
+	"""
+	This class finds the contacts between registered entities. Static
+	entities are indexed once; dynamic ones are registered with their live
+	rect and re-indexed on every query. Only tag pairs passed to watch() are
+	reported, as (entity, other, normal) with the normal pointing towards the
+	first entity.
+	"""
+	def __init__(self, bounds):
+		self.bounds = pg.Rect(bounds)
+		self.static = list()
+		self.dynamic = list()
+		self.static_tree = None
+		self.watched = dict()
+
+	def add_static(self, entity, rect, tag):
+		self.static.append((entity, pg.Rect(rect), tag, len(self.static)))
+		self.static_tree = None
+
+	def add_dynamic(self, entity, rect, tag):
+		self.dynamic.append((entity, rect, tag, len(self.dynamic)))
+
+	def remove(self, entity):
+		static, dynamic = self.static, self.dynamic
+		self.static, self.dynamic = list(), list()
+		for entity_, rect, tag, index in static:
+			if entity_ is not entity:
+				self.add_static(entity_, rect, tag)
+		for entity_, rect, tag, index in dynamic:
+			if entity_ is not entity:
+				self.add_dynamic(entity_, rect, tag)
+		self.static_tree = None
+
+	def watch(self, tag, other_tag):
+		self.watched.setdefault(tag, set()).add(other_tag)
+
+	def build(self, bodies):
+		tree = QuadTree(self.bounds)
+		for body in bodies:
+			tree.insert(body, body[1])
+		return tree
+
+	def query(self):
+		if self.static_tree is None:
+			self.static_tree = self.build(self.static)
+		dynamic_tree = self.build(self.dynamic)
+
+		contacts = list()
+		for body in self.dynamic:
+			entity, rect, tag, index = body
+			other_tags = self.watched.get(tag)
+			if not other_tags:
+				continue
+
+			found = self.static_tree.query(rect, list())
+			for other in dynamic_tree.query(rect, list()):
+				# Dynamic pairs of the same tag are reported once.
+				if other[2] != tag or other[3] > index:
+					found.append(other)
+			for other in found:
+				if other[2] in other_tags and other is not body:
+					contacts.append((entity, other[0], contact_normal(rect, other[1])))
+		return contacts
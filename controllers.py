@@ -0,0 +1,112 @@
+"""
+Paddle controllers for pong and pong4p.
+
+A controller's get_move() returns -1, 0 or 1 to move the paddle back or
+forward along its axis (up/down for vertical paddles, left/right otherwise).
+"""
+
+import weakref
+
+def along(pos, vertical):
+	return pos[1] if vertical else pos[0]
+
+def across(pos, vertical):
+	return pos[0] if vertical else pos[1]
+
+class Controller(object):
+	def get_move(self, paddle, balls, keys):
+		return 0
+
+class KeyboardController(Controller):
+	"""
+	This class moves the paddle with a pair of keys.
+	"""
+	def __init__(self, back, forward):
+		self.back = back
+		self.forward = forward
+
+	def get_move(self, paddle, balls, keys):
+		return int(keys[self.forward]) - int(keys[self.back])
+
+class ChaseController(Controller):
+	"""
+	This class follows the closest ball every frame.
+	"""
+	def __init__(self, deadzone=5):
+		self.deadzone = deadzone
+		self.home = None
+
+	def move_to(self, paddle, target):
+		if self.home is None:
+			self.home = paddle.rect.center
+		if target is None:
+			target = along(self.home, getattr(paddle, "vertical", True))
+
+		diff = target - along(paddle.rect.center, getattr(paddle, "vertical", True))
+		if diff > self.deadzone:
+			return 1
+		elif diff < -self.deadzone:
+			return -1
+		return 0
+
+	def get_move(self, paddle, balls, keys):
+		vertical = getattr(paddle, "vertical", True)
+		line = across(paddle.rect.center, vertical)
+		target = None
+		best = None
+		for b in balls:
+			dist = abs(across(b.rect.center, vertical) - line)
+			if best is None or dist < best:
+				best = dist
+				target = along(b.rect.center, vertical)
+		return self.move_to(paddle, target)
+
+class PredictiveController(ChaseController):
+	"""
+	This class works out where each incoming ball will cross the paddle's
+	line, reflecting off the walls between bounds the way Ball.update does,
+	and moves towards the ball that gets there first. Predictions are cached
+	per ball until it bounces or is reset.
+	"""
+	def __init__(self, bounds=None, deadzone=5):
+		ChaseController.__init__(self, deadzone)
+		self.bounds = bounds
+		self.cache = weakref.WeakKeyDictionary()
+
+	def predict(self, ball, vertical, t):
+		pos = along(ball.rect.topleft, vertical)
+		pos += along(ball.vel, vertical) * ball.speed * t
+
+		if self.bounds is not None:
+			# Unfold the bounces off both walls.
+			low, high = self.bounds
+			span = high - low
+			pos = (pos - low) % (2 * span)
+			if pos > span:
+				pos = 2 * span - pos
+			pos += low
+
+		return pos + along(ball.rect.size, vertical) / 2.0
+
+	def get_move(self, paddle, balls, keys):
+		vertical = getattr(paddle, "vertical", True)
+		line = across(paddle.rect.center, vertical)
+		target = None
+		soonest = None
+		for b in balls:
+			step_across = across(b.vel, vertical) * b.speed
+			if step_across == 0:
+				continue
+			t = (line - across(b.rect.center, vertical)) / float(step_across)
+			if t < 0:
+				continue
+
+			cached = self.cache.get(b)
+			if cached is None or cached[0] != b.bounces:
+				cached = (b.bounces, self.predict(b, vertical, t))
+				self.cache[b] = cached
+
+			if soonest is None or t < soonest:
+				soonest = t
+				target = cached[1]
+		return self.move_to(paddle, target)
@@ -2,17 +2,23 @@
 Flappy Bird, but with a square instead
 """
 
-import os
-import sys
 import random
+import struct
 import pygame as pg
 
+from assets import ASSETS
+from render_queue import QUIT_EVENTS, RenderQueue
+from replay_log import key_bits
+from game_runner import publish, run
+
 SCREEN_SIZE = (640, 360)
 
 TRANSPARENT = (0, 0, 0, 0)
 TRIGGER = pg.K_SPACE
 GRAVITY = -1
 TERMINAL_VELOCITY = -10
+SNAPSHOT = struct.Struct("<IIiiiiii?H") # tick, course seed and position, pipe countdown, score, player, pipe count
+PIPE_SNAPSHOT = struct.Struct("<4i2?")
 
 class Box(object):
 	"""
@@ -28,9 +34,7 @@ class Box(object):
 		self.vel = 0
 
 	def make_image(self):
-		image = pg.Surface(self.rect.size).convert_alpha()
-		image.fill(Box.COLOR)
-		return image
+		return ASSETS.solid(self.rect.size, Box.COLOR)
 
 	def update(self, trigger, screen_rect):
 		if trigger:
@@ -52,8 +56,7 @@ class Lava(object):
 		self.rect = pg.Rect((0, 0), size)
 		self.rect.x = 0
 		self.rect.y = ypos - size[1]
-		self.image = pg.Surface(self.rect.size).convert_alpha()
-		self.image.fill(pg.Color("red"))
+		self.image = ASSETS.solid(self.rect.size, "red")
 
 	def check_collision(self, rect):
 		return self.rect.colliderect(rect)
@@ -72,13 +75,11 @@ class Pipe(object):
 		self.rect = pg.Rect((0, 0), Pipe.SIZE)
 		self.rect.center = pos
 		self.speed = speed
-		self.image = self.make_image() #Could be optimized
+		self.image = self.make_image()
 		self.is_outside = False
 
 	def make_image(self):
-		image = pg.Surface(self.rect.size).convert_alpha()
-		image.fill(Pipe.COLOR)
-		return image
+		return ASSETS.solid(self.rect.size, Pipe.COLOR)
 
 	def update(self):
 		self.rect.x -= self.speed
@@ -92,9 +93,12 @@ class PipeObstacle(object):
 	"""
 	This class defines the pipe pair obstacle.
 	"""
-	def __init__(self, pos, speed):
-		self.pipe_top = Pipe((pos[0], pos[1]+250), speed)
-		self.pipe_bot = Pipe((pos[0], pos[1]-250), speed)
+	GAP = 200
+
+	def __init__(self, pos, speed, gap=GAP):
+		offset = (Pipe.SIZE[1] + gap) // 2
+		self.pipe_top = Pipe((pos[0], pos[1]+offset), speed)
+		self.pipe_bot = Pipe((pos[0], pos[1]-offset), speed)
 		self.x = pos[0]
 		self.is_outside = False
 		self.score_added = False
@@ -117,6 +121,93 @@ class PipeObstacle(object):
 		self.pipe_top.draw(surface)
 		self.pipe_bot.draw(surface)
 
+class Course(object):
+	"""
+	This class defines a seeded stream of pipe obstacles. Each pipe is a
+	tuple of (interval, gap_y, gap, speed), with the interval in frames until
+	the next pipe. Speed goes up and the gap and interval go down as the
+	course goes on.
+	"""
+	SPEED = 5
+	MAX_SPEED = 10
+	SPEED_STEP = 10 # pipes per speed increase
+	GAP = PipeObstacle.GAP
+	MIN_GAP = 120
+	GAP_STEP = 4
+	INTERVAL = 1
+	MIN_INTERVAL = 0.6
+	INTERVAL_STEP = 0.02
+	MARGIN = 100
+
+	FILE_MAGIC = b"FBC1"
+	FILE_HEADER = struct.Struct("<4sIHH")
+	FILE_RECORD = struct.Struct("<HHHH")
+
+	def __init__(self, seed=None, height=SCREEN_SIZE[1], fps=60):
+		self.seed = seed if seed is not None else random.randrange(1 << 32)
+		self.height = height
+		self.fps = fps
+		self.cache = list()
+		self.rng = None
+		self.rng_pos = 0
+
+	def make_pipe(self, rng, n):
+		speed = min(Course.SPEED + n // Course.SPEED_STEP, Course.MAX_SPEED)
+		gap = max(Course.GAP - n * Course.GAP_STEP, Course.MIN_GAP)
+		interval = max(Course.INTERVAL - n * Course.INTERVAL_STEP, Course.MIN_INTERVAL)
+		gap_y = rng.randrange(Course.MARGIN, self.height - Course.MARGIN)
+		return (int(interval * self.fps), gap_y, gap, speed)
+
+	def pipe(self, n):
+		"""
+		Returns the nth pipe of the course, generating and caching the pipes
+		up to it if needed.
+		"""
+		if n >= len(self.cache):
+			if self.rng is None:
+				self.rng = random.Random(self.seed)
+			# Pipes loaded from a file still have to be drawn from the RNG.
+			while self.rng_pos < len(self.cache):
+				self.rng.randrange(Course.MARGIN, self.height - Course.MARGIN)
+				self.rng_pos += 1
+			while len(self.cache) <= n:
+				self.cache.append(self.make_pipe(self.rng, len(self.cache)))
+				self.rng_pos += 1
+		return self.cache[n]
+
+	def stream(self):
+		"""
+		Yields the pipes of the course forever.
+		"""
+		n = 0
+		while True:
+			yield self.pipe(n)
+			n += 1
+
+	def precompute(self, count):
+		if count > 0:
+			self.pipe(count - 1)
+		return self.cache[:count]
+
+	def save(self, path):
+		with open(path, "wb") as f:
+			f.write(Course.FILE_HEADER.pack(Course.FILE_MAGIC, self.seed, self.height, self.fps))
+			for pipe in self.cache:
+				f.write(Course.FILE_RECORD.pack(*pipe))
+
+	@staticmethod
+	def load(path):
+		with open(path, "rb") as f:
+			data = f.read()
+		magic, seed, height, fps = Course.FILE_HEADER.unpack_from(data)
+		if magic != Course.FILE_MAGIC:
+			raise ValueError("Not a course file: " + path)
+		course = Course(seed, height, fps)
+		size = Course.FILE_RECORD.size
+		for offset in range(Course.FILE_HEADER.size, len(data) - size + 1, size):
+			course.cache.append(Course.FILE_RECORD.unpack_from(data, offset))
+		return course
+
 class ScoreCounter(object):
 	"""
 	This class defines the score counter
@@ -131,13 +222,11 @@ class ScoreCounter(object):
 		self.image = self.make_image(self.last_text)
 
 	def make_image(self, text):
-		font = pg.font.SysFont("monospace", 15)
 		#self.size = pg.font.size(text)
 		#self.rect = pg.Rect((0, 0), self.size)
 		#self.rect.center = self.pos
 
-		image = font.render(text, 1, ScoreCounter.COLOR)
-		return image
+		return ASSETS.text("monospace", 15, text, ScoreCounter.COLOR)
 
 	def update(self, text):
 		if text != self.last_text:
@@ -148,13 +237,19 @@ class ScoreCounter(object):
 		surface.blit(self.image, self.rect)
 		
 
+def declare_assets():
+	ASSETS.declare_solid(Box.SIZE, Box.COLOR)
+	ASSETS.declare_solid(Pipe.SIZE, Pipe.COLOR)
+	ASSETS.declare_solid((SCREEN_SIZE[0], 10), "red")
+	for score in range(100):
+		ASSETS.declare_text("monospace", 15, str(score), ScoreCounter.COLOR)
+
 class App(object):
 	"""
 	This class does the things
 	"""
 	PIPE_INTERVAL = 1
-	PIPE_SPEED = 5
-	def __init__(self):
+	def __init__(self, render_queue=None, course=None, log=None, link=None):
 		self.screen = pg.display.get_surface()
 		self.screen_rect = self.screen.get_rect()
 		self.clock = pg.time.Clock()
@@ -171,12 +266,65 @@ class App(object):
 
 		self.pipe_countdown = App.PIPE_INTERVAL * self.fps
 		self.pipes = list()
+		self.fixed_course = course is not None
+		self.course = course if course is not None else Course(height=self.screen_rect.height, fps=self.fps)
+		self.course_pos = 0
 
 		self.lava = Lava((self.screen_rect.width, 10), self.screen_rect.height)
+		self.render_queue = render_queue if render_queue is not None else RenderQueue()
+		self.log = log
+		self.link = link
+		self.tick = 0
+
+	def telemetry(self):
+		values = [key_bits(self.keys, (TRIGGER,)), int(self.game_started), self.score, self.player.rect.y, self.player.vel]
+		for p in self.pipes:
+			values.append(p.pipe_top.rect.x)
+			values.append(p.pipe_top.rect.y)
+			values.append(p.pipe_bot.rect.y)
+		return values
+
+	def snapshot(self):
+		"""
+		Returns the game state as bytes for restore(). Input is not included.
+		"""
+		data = [SNAPSHOT.pack(self.tick, self.course.seed, self.course_pos, self.pipe_countdown, self.score,
+			self.player.rect.x, self.player.rect.y, self.player.vel, self.game_started, len(self.pipes))]
+		for p in self.pipes:
+			data.append(PIPE_SNAPSHOT.pack(p.pipe_top.rect.x, p.pipe_top.rect.y, p.pipe_bot.rect.y,
+				p.pipe_top.speed, p.score_added, p.has_collided))
+		return b"".join(data)
+
+	def restore(self, data):
+		values = SNAPSHOT.unpack_from(data)
+		self.tick = values[0]
+		if values[1] != self.course.seed:
+			self.course = Course(values[1], self.screen_rect.height, self.fps)
+		self.course_pos, self.pipe_countdown, self.score = values[2:5]
+		self.player.rect.topleft = values[5:7]
+		self.player.vel = values[7]
+		self.game_started = values[8]
+		self.score_counter.update(str(self.score))
+
+		offset = SNAPSHOT.size
+		pipes = list()
+		for i in range(values[9]):
+			x, top_y, bot_y, speed, score_added, has_collided = PIPE_SNAPSHOT.unpack_from(data, offset)
+			p = self.pipes[i] if i < len(self.pipes) else PipeObstacle((0, 0), speed)
+			p.pipe_top.rect.topleft = (x, top_y)
+			p.pipe_bot.rect.topleft = (x, bot_y)
+			p.pipe_top.speed = p.pipe_bot.speed = speed
+			p.pipe_top.is_outside = p.pipe_bot.is_outside = p.is_outside = x < -10
+			p.x = x
+			p.score_added = score_added
+			p.has_collided = has_collided
+			pipes.append(p)
+			offset += PIPE_SNAPSHOT.size
+		self.pipes = pipes
 
 	def event_loop(self):
 		for event in pg.event.get():
-			if event.type == pg.QUIT or self.keys[pg.K_ESCAPE]:
+			if event.type in QUIT_EVENTS or self.keys[pg.K_ESCAPE]:
 				self.done = True
 			elif event.type in (pg.KEYUP, pg.KEYDOWN):
 				self.keys = pg.key.get_pressed()
@@ -184,13 +332,17 @@ class App(object):
 					self.game_started = True
 
 	def render(self):
-		self.screen.fill(pg.Color("lightblue"))
+		self.render_queue.begin(self.screen, pg.Color("lightblue"))
+		pipes = list()
 		for p in self.pipes:
-			p.draw(self.screen)
-		self.player.draw(self.screen)
-		self.lava.draw(self.screen)
-		self.score_counter.draw(self.screen)
-		pg.display.update()
+			pipes.append((p.pipe_top.image, p.pipe_top.rect))
+			pipes.append((p.pipe_bot.image, p.pipe_bot.rect))
+		self.render_queue.add(pipes)
+		self.render_queue.add((
+			(self.player.image, self.player.rect),
+			(self.lava.image, self.lava.rect),
+			(self.score_counter.image, self.score_counter.rect)))
+		self.render_queue.present(self.screen)
 
 	def game_over(self):
 		print("Last score: " + str(self.score))
@@ -198,48 +350,56 @@ class App(object):
 		self.game_started = False
 		self.pipes = list()
 		self.player.rect.center = self.screen_rect.center
+		self.pipe_countdown = App.PIPE_INTERVAL * self.fps
+		if not self.fixed_course:
+			self.course = Course(height=self.screen_rect.height, fps=self.fps)
+		self.course_pos = 0
+
+	def update(self):
+		if self.link is not None:
+			self.keys = self.link.keys(self.keys, (TRIGGER,))
+			if self.keys[TRIGGER]:
+				self.game_started = True
+
+		if self.game_started:
+			self.pipe_countdown -= 1
+			if self.pipe_countdown < 0:
+				interval, gap_y, gap, speed = self.course.pipe(self.course_pos)
+				self.course_pos += 1
+				self.pipes.append(PipeObstacle((self.screen_rect.width, gap_y), speed, gap))
+
+				self.pipe_countdown = interval
+
+			for p in self.pipes:
+				p.update()
+				if p.check_collision(self.player.rect):
+					self.game_over()
+
+				if p.x < self.player.rect.center[0]:
+					if not p.score_added:
+						p.score_added = True
+						self.score += 1
+
+				if p.is_outside:
+					self.pipes.remove(p)
+
+			self.player.update(self.keys[TRIGGER], self.screen_rect)
+			self.score_counter.update(str(self.score))
+			if self.lava.check_collision(self.player.rect):
+				self.game_over()
+
+		publish(self)
+		self.tick += 1
 
 	def main_loop(self):
 		while not self.done:
 			self.event_loop()
-
-			if self.game_started:
-				self.pipe_countdown -= 1
-				if self.pipe_countdown < 0:
-					op = (self.screen_rect.width, random.randrange(100, self.screen_rect.height-100))
-					self.pipes.append(PipeObstacle(op, App.PIPE_SPEED))
-					
-					self.pipe_countdown = App.PIPE_INTERVAL * self.fps
-
-				for p in self.pipes:
-					p.update()
-					if p.check_collision(self.player.rect):
-						self.game_over()
-
-					if p.x < self.player.rect.center[0]:
-						if not p.score_added:
-							p.score_added = True
-							self.score += 1
-
-					if p.is_outside:
-						self.pipes.remove(p)
-
-				self.player.update(self.keys[TRIGGER], self.screen_rect)
-				self.score_counter.update(str(self.score))
-				if self.lava.check_collision(self.player.rect):
-					self.game_over()
-
+			self.update()
 			self.render()
 			self.clock.tick(self.fps)
 
 def main():
-	os.environ['SDL_VIDEO_CENTERED'] = '1'
-	pg.init()
-	pg.display.set_caption("Flappy Box")
-	pg.display.set_mode(SCREEN_SIZE)
-	App().main_loop()
-	pg.quit()
-	sys.exit()
+	run(App, "Flappy Box", SCREEN_SIZE, declare_assets)
 
 if __name__ == "__main__":
 	main()
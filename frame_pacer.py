@@ -0,0 +1,88 @@
+"""
+Adaptive frame pacing shared by all the games.
+"""
+
+import pygame as pg
+
+class FramePacer(object):
+	"""
+	This class runs an App's update() at a fixed rate in real time. When a
+	frame takes longer than its budget, the missed updates are run before the
+	next render, skipping up to max_skip frames. While frames stay over
+	budget, the App's set_detail() (if it has one) is asked to draw less.
+	"""
+	SLOW_FRAMES = 30 # over budget frames before lowering detail
+	FAST_FRAMES = 120 # well under budget frames before raising it again
+	MAX_DETAIL = 2
+
+	def __init__(self, fps=60, max_skip=4, adaptive=True, clock=None):
+		self.fps = fps
+		self.max_skip = max_skip
+		self.adaptive = adaptive
+		self.clock = clock if clock is not None else pg.time.Clock()
+		self.detail = 0
+
+		self.frames = 0
+		self.updates = 0
+		self.skipped = 0
+		self.dropped = 0
+		self.detail_changes = 0
+		self.slow = 0
+		self.fast = 0
+
+	def set_detail(self, app, detail):
+		self.detail = detail
+		self.detail_changes += 1
+		if hasattr(app, "set_detail"):
+			app.set_detail(detail)
+
+	def adapt(self, app):
+		# get_rawtime() is the time the last frame took, without the wait.
+		budget = 1000.0 / self.fps
+		busy = self.clock.get_rawtime()
+		if busy > budget:
+			self.slow += 1
+			self.fast = 0
+		elif busy < budget / 2:
+			self.fast += 1
+			self.slow = 0
+
+		if self.slow >= FramePacer.SLOW_FRAMES and self.detail < FramePacer.MAX_DETAIL:
+			self.set_detail(app, self.detail + 1)
+			self.slow = 0
+		elif self.fast >= FramePacer.FAST_FRAMES and self.detail > 0:
+			self.set_detail(app, self.detail - 1)
+			self.fast = 0
+
+	def run(self, app):
+		# lag is how far the game is behind real time after each frame's
+		# update. Running ahead is not tracked, the clock already caps that.
+		step = 1000.0 / self.fps
+		lag = 0.0
+		self.clock.tick()
+		while not app.done:
+			app.event_loop()
+
+			app.update()
+			steps = 1
+			while lag >= step and steps <= self.max_skip:
+				app.update()
+				lag -= step
+				steps += 1
+			if lag >= step:
+				# Too far behind, let the game slow down instead.
+				self.dropped += int(lag // step)
+				lag %= step
+
+			self.updates += steps
+			self.skipped += steps - 1
+			self.frames += 1
+			app.render()
+
+			lag = max(lag + self.clock.tick(self.fps) - step, 0.0)
+			if self.adaptive:
+				self.adapt(app)
+
+	def report(self):
+		return "%d frames, %d updates, %d frames skipped, %d updates dropped, %d detail changes" % (
+			self.frames, self.updates, self.skipped, self.dropped, self.detail_changes)
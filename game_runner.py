@@ -0,0 +1,55 @@
+"""
+Startup and per-tick plumbing shared by all the games.
+"""
+
+import os
+import sys
+import pygame as pg
+
+from agent_link import open_link
+from assets import ASSETS
+from frame_pacer import FramePacer
+from render_queue import create_display
+from replay_log import open_log
+
+def publish(app):
+	"""
+	Sends the App's telemetry() for the current tick to its log and agent
+	link, if it has them.
+	"""
+	if app.log is None and app.link is None:
+		return
+	values = app.telemetry()
+	if app.log is not None:
+		app.log.write(app.tick, values)
+	if app.link is not None:
+		app.link.publish(app.tick, values)
+
+def run(App, caption, screen_size, declare_assets, **kwargs):
+	"""
+	Opens the display, loads the declared assets and runs App until it's
+	done, then exits. Handles the --hw, --log, --agent and --adaptive
+	command line options; kwargs are passed on to App.
+	"""
+	argv = sys.argv[1:]
+	os.environ['SDL_VIDEO_CENTERED'] = '1'
+	pg.init()
+	pg.display.set_caption(caption)
+	render_queue = create_display(screen_size, "--hw" in argv)
+	declare_assets()
+	ASSETS.load()
+	log = open_log(argv)
+	link = open_link(argv)
+	app = App(render_queue, log=log, link=link, **kwargs)
+	if "--adaptive" in argv:
+		pacer = FramePacer(app.fps)
+		pacer.run(app)
+		print(pacer.report())
+	else:
+		app.main_loop()
+	if log is not None:
+		log.close()
+	if link is not None:
+		link.close()
+	pg.quit()
+	sys.exit()
@@ -2,11 +2,18 @@
 Four player pong
 """
 
-import os
 import sys
 import random
+import struct
 import pygame as pg
 
+from assets import ASSETS
+from collision import CollisionWorld
+from render_queue import QUIT_EVENTS, RenderQueue
+from controllers import KeyboardController, PredictiveController
+from replay_log import key_bits
+from game_runner import publish, run
+
 SCREEN_SIZE = (720, 720)
 PADMARGIN = 50
 PADSIZE = (10, 100)
@@ -41,6 +48,15 @@ CONTROLS = {
 		RT: pg.K_m
 	}
 }
+LOG_KEYS = (
+	CONTROLS[PL][UP], CONTROLS[PL][DN],
+	CONTROLS[PR][UP], CONTROLS[PR][DN],
+	CONTROLS[PT][LF], CONTROLS[PT][RT],
+	CONTROLS[PB][LF], CONTROLS[PB][RT]
+)
+SNAPSHOT = struct.Struct("<I4i8iH") # tick, scores, paddle positions, ball count
+BALL_SNAPSHOT = struct.Struct("<5i")
+
 DIRS = (
 	(-1, -1),
 	(-1,  1),
@@ -48,6 +64,11 @@ DIRS = (
 	( 1,  1)
 )
 
+BALL = "BALL"
+PADDLE = "PADDLE"
+GOAL = "GOAL"
+GOAL_DEPTH = 1000
+
 WHITE = pg.Color("white")
 BLACK = pg.Color("black")
 
@@ -55,8 +76,7 @@ class Paddle(object):
 	def __init__(self, pos, size, vertical):
 		self.rect = pg.Rect((0, 0), size)
 		self.rect.center = pos
-		self.image = pg.Surface(self.rect.size).convert_alpha()
-		self.image.fill(WHITE)
+		self.image = ASSETS.solid(self.rect.size, WHITE)
 		self.acc = 0
 		self.vertical = vertical
 
@@ -84,37 +104,42 @@ class Ball(object):
 	def __init__(self, pos, size, vel, speed):
 		self.rect = pg.Rect((0, 0), (size, size))
 		self.rect.center = pos
-		self.image = pg.Surface(self.rect.size).convert_alpha()
-		self.image.fill(WHITE)
+		self.image = ASSETS.solid(self.rect.size, WHITE)
 		self.vel = vel
 		self.speed = speed
+		self.bounces = 0
 
 		self.o_pos = pos
 		self.o_vel = vel
 		self.o_speed = speed
 
-	def update(self, screen_rect, plrect, prrect, ptrect, pbrect):
+	def move(self):
 		self.rect.x += self.vel[0] * self.speed
 		self.rect.y += self.vel[1] * self.speed
 
-		if self.rect.colliderect(plrect) or self.rect.colliderect(prrect):
-			self.vel = (self.vel[0] * -1, self.vel[1])
-
-		if self.rect.colliderect(ptrect) or self.rect.colliderect(pbrect):
-			self.vel = (self.vel[0], self.vel[1] * -1)
-
-		#if self.rect.y < 0 or self.rect.y > screen_rect.height:
-		#	self.vel = (self.vel[0], self.vel[1] * -1)
+	def bounce(self, normal):
+		# Only turn the ball away from the contact, so it doesn't get stuck
+		# flipping back and forth inside a paddle.
+		vx, vy = self.vel
+		if vx * normal[0] < 0:
+			vx = -vx
+		if vy * normal[1] < 0:
+			vy = -vy
+		if (vx, vy) != self.vel:
+			self.vel = (vx, vy)
+			self.bounces += 1
 
 	def set(self, pos, vel, speed):
 		self.rect.center = pos
 		self.vel = vel
 		self.speed = speed
+		self.bounces += 1
 
 	def reset(self):
 		self.rect.center = self.o_pos
 		self.vel = self.o_vel
 		self.speed = self.o_speed
+		self.bounces += 1
 
 	def reset_rnd(self):
 		self.reset()
@@ -143,14 +168,20 @@ class ScoreCounter(object):
 			self.image = self.make_image()
 
 	def make_image(self):
-		font = pg.font.SysFont("monospace", 36)
-		return font.render(str(self.score), 1, WHITE)
+		return ASSETS.text("monospace", 36, str(self.score), WHITE)
 
 	def draw(self, surface):
 		surface.blit(self.image, self.rect)
 
+def declare_assets():
+	ASSETS.declare_solid(PADSIZE, WHITE)
+	ASSETS.declare_solid(PADSIZE[::-1], WHITE)
+	ASSETS.declare_solid((5, 5), WHITE)
+	for score in range(21):
+		ASSETS.declare_text("monospace", 36, str(score), WHITE)
+
 class App(object):
-	def __init__(self):
+	def __init__(self, render_queue=None, controllers=None, log=None, link=None):
 		self.screen = pg.display.get_surface()
 		self.screen_rect = self.screen.get_rect()
 		self.clock = pg.time.Clock()
@@ -172,90 +203,170 @@ class App(object):
 		#self.ball2 = Ball(self.screen_rect.center, 5, (-1, 1), 7)
 		#self.ball3 = Ball(self.screen_rect.center, 5, (1, -1), 10)
 
+		self.balls = [self.ball]
+		self.paddles = {
+			PL: self.pl,
+			PR: self.pr,
+			PT: self.pt,
+			PB: self.pb
+		}
+		if controllers is None:
+			controllers = {
+				PL: KeyboardController(CONTROLS[PL][UP], CONTROLS[PL][DN]),
+				PR: KeyboardController(CONTROLS[PR][UP], CONTROLS[PR][DN]),
+				PT: KeyboardController(CONTROLS[PT][LF], CONTROLS[PT][RT]),
+				PB: KeyboardController(CONTROLS[PB][LF], CONTROLS[PB][RT])
+			}
+		self.controllers = controllers
+
+		self.scores = {
+			PL: self.sl,
+			PR: self.sr,
+			PT: self.st,
+			PB: self.sb
+		}
+		self.collisions = self.make_collisions()
+
+		self.render_queue = render_queue if render_queue is not None else RenderQueue()
+		self.log = log
+		self.link = link
+		self.tick = 0
+
+	def telemetry(self):
+		values = [key_bits(self.keys, LOG_KEYS)]
+		values.extend((self.sl.score, self.sr.score, self.st.score, self.sb.score, self.pl.rect.y, self.pr.rect.y, self.pt.rect.x, self.pb.rect.x))
+		for b in self.balls:
+			values.extend((b.rect.x, b.rect.y, b.vel[0], b.vel[1], b.speed))
+		return values
+
+	def snapshot(self):
+		"""
+		Returns the game state as bytes for restore(). Input and the state of
+		the random module are not included.
+		"""
+		data = [SNAPSHOT.pack(self.tick, self.sl.score, self.sr.score, self.st.score, self.sb.score,
+			self.pl.rect.x, self.pl.rect.y,
+			self.pr.rect.x, self.pr.rect.y,
+			self.pt.rect.x, self.pt.rect.y,
+			self.pb.rect.x, self.pb.rect.y,
+			len(self.balls))]
+		for b in self.balls:
+			data.append(BALL_SNAPSHOT.pack(b.rect.x, b.rect.y, b.vel[0], b.vel[1], b.speed))
+		return b"".join(data)
+
+	def restore(self, data):
+		values = SNAPSHOT.unpack_from(data)
+		if values[-1] != len(self.balls):
+			raise ValueError("Snapshot has %d balls, game has %d" % (values[-1], len(self.balls)))
+
+		self.tick = values[0]
+		for i, s in enumerate((self.sl, self.sr, self.st, self.sb)):
+			s.set_score(values[1 + i])
+		for i, p in enumerate((self.pl, self.pr, self.pt, self.pb)):
+			p.rect.topleft = values[5 + 2*i:7 + 2*i]
+
+		offset = SNAPSHOT.size
+		for b in self.balls:
+			x, y, vx, vy, speed = BALL_SNAPSHOT.unpack_from(data, offset)
+			b.rect.topleft = (x, y)
+			b.vel = (vx, vy)
+			b.speed = speed
+			b.bounces += 1
+			offset += BALL_SNAPSHOT.size
 
 	def event_loop(self):
 		for event in pg.event.get():
-			if event.type == pg.QUIT or self.keys[pg.K_ESCAPE]:
+			if event.type in QUIT_EVENTS or self.keys[pg.K_ESCAPE]:
 				self.done = True
 			elif event.type in (pg.KEYUP, pg.KEYDOWN):
 				self.keys = pg.key.get_pressed()
 
 	def render(self):
-		self.screen.fill(BLACK)
-
-		self.pl.draw(self.screen)
-		self.pr.draw(self.screen)
-		self.pt.draw(self.screen)
-		self.pb.draw(self.screen)
-
-		self.sl.draw(self.screen)
-		self.sr.draw(self.screen)
-		self.sb.draw(self.screen)
-		self.st.draw(self.screen)
-
-		self.ball.draw(self.screen)
-		#self.ball2.draw(self.screen)
-		#self.ball3.draw(self.screen)
-
-		pg.display.update()
-
-	def check_collision(self, ball):
-		if ball.rect.x < 0:
-			self.sr.add_score(1)
-			self.st.add_score(1)
-			self.sb.add_score(1)
-			ball.reset_rnd()
-		elif ball.rect.x > self.screen_rect.width:
-			self.sl.add_score(1)
-			self.st.add_score(1)
-			self.sb.add_score(1)
-			ball.reset_rnd()
-		elif ball.rect.y > self.screen_rect.height:
-			self.sl.add_score(1)
-			self.sr.add_score(1)
-			self.st.add_score(1)
-			ball.reset_rnd()
-		elif ball.rect.y < 0:
-			self.sl.add_score(1)
-			self.sr.add_score(1)
-			self.sb.add_score(1)
-			ball.reset_rnd()
+		self.render_queue.begin(self.screen, BLACK)
+
+		self.render_queue.add((
+			(self.pl.image, self.pl.rect),
+			(self.pr.image, self.pr.rect),
+			(self.pt.image, self.pt.rect),
+			(self.pb.image, self.pb.rect),
+			(self.sl.image, self.sl.rect),
+			(self.sr.image, self.sr.rect),
+			(self.sb.image, self.sb.rect),
+			(self.st.image, self.st.rect)))
+
+		self.render_queue.add([(b.image, b.rect) for b in self.balls])
+
+		self.render_queue.present(self.screen)
+
+	def make_collisions(self):
+		"""
+		Registers the balls and paddles, and a goal area past each side of
+		the screen owned by the player defending it.
+		"""
+		width, height = self.screen_rect.size
+		world = CollisionWorld(self.screen_rect)
+		world.add_static(PL, (-GOAL_DEPTH, -GOAL_DEPTH, GOAL_DEPTH, height + 2*GOAL_DEPTH), GOAL)
+		world.add_static(PR, (width, -GOAL_DEPTH, GOAL_DEPTH, height + 2*GOAL_DEPTH), GOAL)
+		world.add_static(PT, (-GOAL_DEPTH, -GOAL_DEPTH, width + 2*GOAL_DEPTH, GOAL_DEPTH), GOAL)
+		world.add_static(PB, (-GOAL_DEPTH, height, width + 2*GOAL_DEPTH, GOAL_DEPTH), GOAL)
+		for paddle in self.paddles.values():
+			world.add_dynamic(paddle, paddle.rect, PADDLE)
+		for b in self.balls:
+			world.add_dynamic(b, b.rect, BALL)
+		world.watch(BALL, PADDLE)
+		world.watch(BALL, GOAL)
+		return world
+
+	def score_goal(self, ball, player):
+		for other, counter in self.scores.items():
+			if other != player:
+				counter.add_score(1)
+		ball.reset_rnd()
+
+	def check_collision(self):
+		scored = set()
+		for ball, other, normal in self.collisions.query():
+			if ball in scored:
+				continue
+			if other in self.scores:
+				self.score_goal(ball, other)
+				scored.add(ball)
+			else:
+				ball.bounce(normal)
+
+	def update(self):
+		if self.link is not None:
+			self.keys = self.link.keys(self.keys, LOG_KEYS)
+
+		for player, paddle in self.paddles.items():
+			move = self.controllers[player].get_move(paddle, self.balls, self.keys)
+			if move: paddle.update(move * PADSPEED, self.screen_rect)
+
+		for b in self.balls:
+			b.move()
+		self.check_collision()
+
+		publish(self)
+		self.tick += 1
 
 	def main_loop(self):
 		while not self.done:
 			self.event_loop()
-
-			if self.keys[CONTROLS[PL][UP]]: self.pl.update(-PADSPEED, self.screen_rect)
-			if self.keys[CONTROLS[PL][DN]]: self.pl.update(PADSPEED, self.screen_rect)
-
-			if self.keys[CONTROLS[PR][UP]]: self.pr.update(-PADSPEED, self.screen_rect)
-			if self.keys[CONTROLS[PR][DN]]: self.pr.update(PADSPEED, self.screen_rect)
-
-			if self.keys[CONTROLS[PT][LF]]: self.pt.update(-PADSPEED, self.screen_rect)
-			if self.keys[CONTROLS[PT][RT]]: self.pt.update(PADSPEED, self.screen_rect)
-
-			if self.keys[CONTROLS[PB][LF]]: self.pb.update(-PADSPEED, self.screen_rect)
-			if self.keys[CONTROLS[PB][RT]]: self.pb.update(PADSPEED, self.screen_rect)
-
-			self.ball.update(self.screen_rect, self.pl.rect, self.pr.rect, self.pt.rect, self.pb.rect)
-			#self.ball2.update(self.screen_rect, self.pl.rect, self.pr.rect)
-			#self.ball3.update(self.screen_rect, self.pl.rect, self.pr.rect)
-
-			self.check_collision(self.ball)
-			#self.check_collision(self.ball2)
-			#self.check_collision(self.ball3)
-
+			self.update()
 			self.render()
 			self.clock.tick(self.fps)
 
+def ai_controllers():
+	return {
+		PL: PredictiveController(),
+		PR: PredictiveController(),
+		PT: PredictiveController(),
+		PB: PredictiveController()
+	}
+
 def main():
-	os.environ['SDL_VIDEO_CENTERED'] = '1'
-	pg.init()
-	pg.display.set_caption("PONG")
-	pg.display.set_mode(SCREEN_SIZE)
-	App().main_loop()
-	pg.quit()
-	sys.exit()
+	controllers = ai_controllers() if "--ai" in sys.argv[1:] else None
+	run(App, "PONG", SCREEN_SIZE, declare_assets, controllers=controllers)
 
 if __name__ == "__main__":
 	main()
@@ -0,0 +1,117 @@
+"""
+Batched draw submission shared by all the games.
+"""
+
+import weakref
+import pygame as pg
+
+try:
+	from pygame._sdl2 import video
+	from pygame._sdl2.sdl2 import error as sdl2_error
+except ImportError:
+	video = None
+	sdl2_error = pg.error
+
+# With a renderer window, closing it only sends WINDOWCLOSE (pygame 2).
+QUIT_EVENTS = (pg.QUIT, getattr(pg, "WINDOWCLOSE", pg.QUIT))
+
+class RenderQueue(object):
+	"""
+	This class collects the blit sequences of a frame, one per layer, and
+	submits each with a single Surface.blits call in the order they were
+	added. Sequences are (source, dest) or (source, dest, area) tuples, the
+	same as Surface.blits takes.
+	"""
+	def __init__(self):
+		self.layers = list()
+
+	def add(self, blits):
+		self.layers.append(blits)
+
+	def clear(self):
+		self.layers = list()
+
+	def flush(self, surface, dirty=None):
+		"""
+		Draws everything queued onto surface. If a dirty list is given, the
+		changed rects are appended to it.
+		"""
+		layers = self.layers
+		self.clear()
+		for blits in layers:
+			if not hasattr(surface, "blits"):
+				# pygame older than 1.9.4
+				rects = [surface.blit(*b) for b in blits]
+			elif dirty is None:
+				surface.blits(blits, doreturn=False)
+				continue
+			else:
+				rects = surface.blits(blits)
+
+			if dirty is not None:
+				dirty.extend(rects)
+
+	def begin(self, surface, color):
+		surface.fill(color)
+
+	def present(self, surface):
+		self.flush(surface)
+		pg.display.update()
+
+class TextureRenderQueue(RenderQueue):
+	"""
+	This class draws the queued sequences with an SDL renderer. Every source
+	surface is uploaded once as a texture and reused while it is alive.
+	"""
+	def __init__(self, renderer):
+		RenderQueue.__init__(self)
+		self.renderer = renderer
+		self.textures = weakref.WeakKeyDictionary()
+
+	def get_texture(self, source):
+		texture = self.textures.get(source)
+		if texture is None:
+			texture = video.Texture.from_surface(self.renderer, source)
+			self.textures[source] = texture
+		return texture
+
+	def flush(self, surface, dirty=None):
+		layers = self.layers
+		self.clear()
+		for blits in layers:
+			for b in blits:
+				source, dest = b[0], b[1]
+				area = b[2] if len(b) > 2 else None
+				# Like Surface.blit, only the position of dest is used.
+				size = area[2:] if area is not None else source.get_size()
+				dest = pg.Rect((dest[0], dest[1]), size)
+				self.get_texture(source).draw(srcrect=area, dstrect=dest)
+				if dirty is not None:
+					dirty.append(pg.Rect(dest))
+
+	def begin(self, surface, color):
+		self.renderer.draw_color = pg.Color(color)
+		self.renderer.clear()
+
+	def present(self, surface):
+		self.flush(surface)
+		self.renderer.present()
+
+def create_display(size, hardware=False):
+	"""
+	Sets the display mode and returns the render queue to draw with. With
+	hardware set, drawing goes through an SDL renderer window if pygame._sdl2
+	is available; otherwise it falls back to software blits. The display
+	surface is still created (hidden) so convert_alpha() keeps working.
+	"""
+	if hardware and video is not None:
+		try:
+			pg.display.set_mode(size, pg.HIDDEN)
+			window = video.Window(pg.display.get_caption()[0], size,
+				position=video.WINDOWPOS_CENTERED)
+			return TextureRenderQueue(video.Renderer(window))
+		except (pg.error, sdl2_error):
+			pass
+
+	pg.display.set_mode(size)
+	return RenderQueue()
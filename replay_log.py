@@ -0,0 +1,150 @@
+"""
+Append-only binary log of per-tick game state.
+
+The log file is a magic header followed by one record per tick: the tick
+number, the number of values and the values themselves as 32 bit ints.
+Next to it, PATH.idx holds a (tick, offset) entry per record, so a reader can
+mmap both files and seek to any tick without reading the whole log.
+Ticks restart at 0 every session, so each LogWriter starts a new log and
+replaces whatever was at PATH.
+"""
+
+import os
+import sys
+import mmap
+import struct
+
+MAGIC = b"PGL1"
+RECORD = struct.Struct("<II")
+INDEX = struct.Struct("<IQ")
+
+def key_bits(keys, codes):
+	"""
+	Packs the pressed state of the given keys into an int.
+	"""
+	bits = 0
+	for i, code in enumerate(codes):
+		if keys[code]:
+			bits |= 1 << i
+	return bits
+
+def open_log(argv=None):
+	"""
+	Returns a LogWriter for "--log PATH" on the command line, or None.
+	"""
+	argv = sys.argv[1:] if argv is None else argv
+	if "--log" in argv[:-1]:
+		return LogWriter(argv[argv.index("--log") + 1])
+	return None
+
+class LogWriter(object):
+	def __init__(self, path, buffer_size=1 << 16):
+		self.path = path
+		self.file = open(path, "wb", buffer_size)
+		self.index = open(path + ".idx", "wb", buffer_size)
+		self.file.write(MAGIC)
+		self.offset = len(MAGIC)
+
+	def write(self, tick, values):
+		data = RECORD.pack(tick, len(values)) + struct.pack("<%di" % len(values), *values)
+		self.index.write(INDEX.pack(tick, self.offset))
+		self.file.write(data)
+		self.offset += len(data)
+
+	def flush(self):
+		self.file.flush()
+		self.index.flush()
+
+	def close(self):
+		self.file.close()
+		self.index.close()
+
+class LogReader(object):
+	"""
+	This class reads a log through mmap. Ticks have to be written in
+	increasing order for read() to find them. Records missing from the index
+	(e.g. after a crash) are found by scanning from the last indexed record.
+	A log the writer hasn't flushed anything to yet reads as empty.
+	"""
+	def __init__(self, path):
+		self.file = open(path, "rb")
+		self.index_file = None
+		if os.path.getsize(path) < len(MAGIC):
+			# mmap can't map an empty file.
+			self.data = b""
+		else:
+			self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+			if self.data[:len(MAGIC)] != MAGIC:
+				self.close()
+				raise ValueError("Not a log file: " + path)
+
+		self.index = b""
+		self.count = 0
+		if os.path.exists(path + ".idx") and os.path.getsize(path + ".idx") >= INDEX.size:
+			self.index_file = open(path + ".idx", "rb")
+			self.index = mmap.mmap(self.index_file.fileno(), 0, access=mmap.ACCESS_READ)
+			self.count = len(self.index) // INDEX.size
+			while self.count and not self.complete(self.entry(self.count - 1)[1]):
+				self.count -= 1
+
+		self.tail = list()
+		if self.count:
+			offset = self.record_end(self.entry(self.count - 1)[1])
+		else:
+			offset = len(MAGIC)
+		while self.complete(offset):
+			self.tail.append((RECORD.unpack_from(self.data, offset)[0], offset))
+			offset = self.record_end(offset)
+
+	def record_end(self, offset):
+		return offset + RECORD.size + 4 * RECORD.unpack_from(self.data, offset)[1]
+
+	def complete(self, offset):
+		return offset + RECORD.size <= len(self.data) and self.record_end(offset) <= len(self.data)
+
+	def entry(self, i):
+		if i >= self.count:
+			return self.tail[i - self.count]
+		return INDEX.unpack_from(self.index, i * INDEX.size)
+
+	def __len__(self):
+		return self.count + len(self.tail)
+
+	def values_at(self, offset):
+		tick, length = RECORD.unpack_from(self.data, offset)
+		return struct.unpack_from("<%di" % length, self.data, offset + RECORD.size)
+
+	def find(self, tick):
+		"""
+		Returns the position of the first record at or after tick.
+		"""
+		low, high = 0, len(self)
+		while low < high:
+			mid = (low + high) // 2
+			if self.entry(mid)[0] < tick:
+				low = mid + 1
+			else:
+				high = mid
+		return low
+
+	def read(self, tick):
+		i = self.find(tick)
+		if i == len(self) or self.entry(i)[0] != tick:
+			raise KeyError(tick)
+		return self.values_at(self.entry(i)[1])
+
+	def iter_from(self, tick=0):
+		for i in range(self.find(tick), len(self)):
+			t, offset = self.entry(i)
+			yield t, self.values_at(offset)
+
+	def __iter__(self):
+		return self.iter_from()
+
+	def close(self):
+		if isinstance(self.data, mmap.mmap):
+			self.data.close()
+		self.file.close()
+		if self.index_file is not None:
+			self.index.close()
+			self.index_file.close()
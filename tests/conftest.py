@@ -0,0 +1,38 @@
+"""
+Runs the games headless with SDL's dummy drivers.
+"""
+
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame as pg
+import pytest
+
+class Keys(object):
+	"""
+	Scripted stand-in for pg.key.get_pressed().
+	"""
+	def __init__(self, *pressed):
+		self.pressed = set(pressed)
+
+	def __getitem__(self, key):
+		return key in self.pressed
+
+@pytest.fixture
+def boot():
+	"""
+	Returns a function that opens the display for a game module and builds
+	its App with no keys pressed.
+	"""
+	def boot(module, **kwargs):
+		pg.init()
+		pg.display.set_mode(module.SCREEN_SIZE)
+		app = module.App(**kwargs)
+		app.keys = Keys()
+		return app
+	yield boot
+	pg.quit()
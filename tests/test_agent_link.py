@@ -0,0 +1,56 @@
+import os
+import sys
+import subprocess
+
+import pong
+from agent_link import AgentLink, RingBuffer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AGENT = """
+import sys
+sys.path.insert(0, %r)
+from agent_link import AgentLink
+link = AgentLink(%r)
+seq, tick, values = link.observe()
+link.act(tick, 2)
+print(tick, values[0])
+link.close()
+"""
+
+def test_ring_buffer_keeps_latest_slots():
+	ring = RingBuffer("pgc_ring_%d" % os.getpid(), slots=4, values=3, create=True)
+	try:
+		assert ring.read() is None
+		for tick in range(10):
+			ring.write(tick, (tick, tick + 1, tick + 2, tick + 3))
+		assert ring.read() == (10, 9, (9, 10, 11))
+		assert ring.read(7) == (7, 6, (6, 7, 8))
+		assert ring.read(5) is None
+	finally:
+		ring.close()
+
+def test_agent_process_drives_paddle(boot):
+	name = "pgc_link_%d" % os.getpid()
+	link = AgentLink(name, create=True)
+	try:
+		app = boot(pong, link=link)
+		app.update()
+		y = app.pl.rect.y
+
+		# The second key bit is the left player's down key.
+		out = subprocess.check_output([sys.executable, "-c", AGENT % (ROOT, name)], timeout=60)
+		assert out.split() == [b"0", b"0"]
+		app.update()
+		assert app.pl.rect.y == y + pong.PADSPEED
+	finally:
+		link.close()
+
+def test_games_import_without_shared_memory():
+	# As on Python older than 3.8, which has neither module.
+	script = ("import sys; sys.path.insert(0, %r)\n"
+		"sys.modules['multiprocessing.shared_memory'] = None\n"
+		"sys.modules['concurrent.futures'] = None\n"
+		"import avoid_the_dots, flappybox, pong, pong4p, agent_link\n"
+		"print(agent_link.open_link([]))") % ROOT
+	output = subprocess.check_output([sys.executable, "-c", script], env=dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1"))
+	assert output.split() == [b"None"]
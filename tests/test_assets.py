@@ -0,0 +1,37 @@
+import sys
+
+import pong
+from assets import AssetManager
+
+def test_load_builds_declared_assets(boot):
+	boot(pong)
+	assets = AssetManager()
+	assets.declare_solid((10, 10), "red")
+	for score in range(5):
+		assets.declare_text("monospace", 36, str(score), pong.WHITE)
+
+	progress = list()
+	assets.load(lambda done, total: progress.append((done, total)))
+	assert progress[-1] == (7, 7)
+	assert assets.builders == dict()
+	assert assets.solid((10, 10), "red").get_at((0, 0)) == (255, 0, 0, 255)
+
+def test_undeclared_assets_are_built_once(boot):
+	boot(pong)
+	assets = AssetManager()
+	image = assets.solid((10, 10), "red")
+	assert assets.solid((10, 10), (255, 0, 0)) is image
+	assert assets.text("monospace", 36, "1", pong.WHITE) is assets.text("monospace", 36, "1", pong.WHITE)
+
+def test_load_without_thread_pool(boot, monkeypatch):
+	boot(pong)
+	monkeypatch.setitem(sys.modules, "concurrent.futures", None)
+	assets = AssetManager()
+	assets.declare_solid((10, 10), "red")
+	assets.declare_text("monospace", 36, "1", pong.WHITE)
+
+	progress = list()
+	assets.load(lambda done, total: progress.append((done, total)))
+	assert progress[-1] == (3, 3)
+	assert assets.builders == dict()
+	assert assets.text("monospace", 36, "1", pong.WHITE).get_width() > 0
@@ -0,0 +1,56 @@
+import random
+import pygame as pg
+
+import avoid_the_dots
+from conftest import Keys
+
+def test_set_health_clamps_to_max(boot):
+	app = boot(avoid_the_dots)
+	app.player.setHealth(150)
+	assert app.player.health == app.player.max_health
+	assert not app.player.dead
+
+def test_set_health_kills_at_zero(boot):
+	app = boot(avoid_the_dots)
+	app.player.setHealth(0)
+	assert app.player.dead
+
+def test_health_image_comes_from_strip(boot):
+	app = boot(avoid_the_dots)
+	app.player.setHealth(40)
+	assert app.player.image is app.player.frames[40]
+	app.player.setHealth(-10)
+	assert app.player.image is app.player.frames[0]
+
+def test_collision_damages_player(boot):
+	app = boot(avoid_the_dots)
+	obstacle = avoid_the_dots.Obstacle(app.player.rect.center, 1, 10)
+	app.obstacles.append(obstacle)
+	app.check_collision()
+	assert app.player.health == app.player.max_health - 10
+	assert obstacle not in app.obstacles
+
+def test_player_moves_with_keys(boot):
+	app = boot(avoid_the_dots)
+	x = app.player.rect.x
+	app.keys = Keys(pg.K_RIGHT)
+	for i in range(10):
+		app.update()
+	assert app.player.rect.x > x
+
+def test_snapshot_restore_replays_identically(boot):
+	app = boot(avoid_the_dots)
+	for i in range(100):
+		app.update()
+	snapshot = app.snapshot()
+
+	random.seed(0)
+	for i in range(100):
+		app.update()
+	expected = app.snapshot()
+
+	app.restore(snapshot)
+	random.seed(0)
+	for i in range(100):
+		app.update()
+	assert app.snapshot() == expected
@@ -0,0 +1,28 @@
+import pygame as pg
+
+from collision import CollisionWorld, QuadTree, contact_normal
+
+def test_contact_normal_points_towards_first_rect():
+	assert contact_normal(pg.Rect(8, 0, 10, 10), pg.Rect(0, 0, 10, 10)) == (1, 0)
+	assert contact_normal(pg.Rect(0, -8, 10, 10), pg.Rect(0, 0, 10, 10)) == (0, -1)
+
+def test_quadtree_finds_overlapping_items():
+	tree = QuadTree((0, 0, 100, 100), max_items=2)
+	for i in range(10):
+		tree.insert(i, pg.Rect(i * 10, i * 10, 5, 5))
+	assert tree.children is not None
+	assert sorted(tree.query(pg.Rect(0, 0, 22, 22), list())) == [0, 1, 2]
+
+def test_world_reports_watched_pairs_once():
+	world = CollisionWorld((0, 0, 100, 100))
+	a, b, wall = pg.Rect(0, 0, 10, 10), pg.Rect(5, 0, 10, 10), pg.Rect(0, 0, 100, 5)
+	world.add_dynamic("a", a, "ball")
+	world.add_dynamic("b", b, "ball")
+	world.add_static("wall", wall, "wall")
+	world.watch("ball", "ball")
+	assert world.query() == [("a", "b", (-1, 0))]
+
+	world.watch("ball", "wall")
+	assert len(world.query()) == 3
+	world.remove("a")
+	assert sorted(c[0] for c in world.query()) == ["b"]
@@ -0,0 +1,88 @@
+import itertools
+
+import flappybox
+from conftest import Keys
+
+def test_game_over_resets(boot):
+	app = boot(flappybox)
+	app.game_started = True
+	app.score = 5
+	app.course_pos = 3
+	app.pipes.append(flappybox.PipeObstacle((100, 100), 5))
+	app.player.rect.y = 0
+
+	app.game_over()
+	assert app.score == 0
+	assert not app.game_started
+	assert app.pipes == []
+	assert app.course_pos == 0
+	assert app.player.rect.center == app.screen_rect.center
+
+def test_falling_into_lava_ends_game(boot):
+	app = boot(flappybox)
+	app.game_started = True
+	for i in range(100):
+		app.update()
+	assert not app.game_started
+
+def test_passing_pipe_scores(boot):
+	app = boot(flappybox)
+	app.game_started = True
+	center = app.player.rect.center
+	app.pipes.append(flappybox.PipeObstacle((center[0] - 100, center[1]), 5))
+	app.keys = Keys(flappybox.TRIGGER)
+	app.update()
+	assert app.score == 1
+	app.update()
+	assert app.score == 1
+
+def test_fixed_course_replays_after_game_over(boot):
+	app = boot(flappybox, course=flappybox.Course(7))
+	pipes = [app.course.pipe(n) for n in range(10)]
+	app.game_over()
+	assert [app.course.pipe(n) for n in range(10)] == pipes
+
+def test_course_cache_round_trip(tmpdir):
+	path = str(tmpdir.join("course.bin"))
+	expected = list(itertools.islice(flappybox.Course(42).stream(), 50))
+
+	course = flappybox.Course(42)
+	course.precompute(20)
+	course.save(path)
+	loaded = flappybox.Course.load(path)
+	assert list(itertools.islice(loaded.stream(), 50)) == expected
+
+def play(app, ticks):
+	# Flap every 20 ticks; keyed on app.tick so a restored game replays it.
+	for i in range(ticks):
+		app.keys = Keys(flappybox.TRIGGER) if app.tick % 20 == 0 else Keys()
+		app.update()
+
+def test_snapshot_restore_replays_identically(boot):
+	app = boot(flappybox, course=flappybox.Course(7))
+	app.game_started = True
+	play(app, 75)
+	snapshot = app.snapshot()
+	assert app.pipes
+
+	# Runs through a game over and the next start.
+	play(app, 100)
+	expected = app.snapshot()
+
+	app.restore(snapshot)
+	play(app, 100)
+	assert app.snapshot() == expected
+
+def test_restore_rebuilds_course_from_seed(boot):
+	app = boot(flappybox, course=flappybox.Course(7))
+	app.game_started = True
+	play(app, 75)
+	snapshot = app.snapshot()
+	play(app, 30)
+
+	other = flappybox.App()
+	other.keys = Keys()
+	other.restore(snapshot)
+	assert other.course.seed == 7
+	play(other, 30)
+	assert other.snapshot() == app.snapshot()
@@ -0,0 +1,77 @@
+from frame_pacer import FramePacer
+
+class FakeClock(object):
+	"""
+	Scripted stand-in for pg.time.Clock: each frame is (tick, rawtime) in ms.
+	"""
+	def __init__(self, frames):
+		self.frames = list(frames)
+		self.rawtime = 0
+
+	def tick(self, framerate=0):
+		if not framerate:
+			return 0
+		elapsed, self.rawtime = self.frames.pop(0)
+		return elapsed
+
+	def get_rawtime(self):
+		return self.rawtime
+
+class FakeApp(object):
+	def __init__(self, frames):
+		self.frames = frames
+		self.done = False
+		self.updates = 0
+		self.per_frame = list()
+		self.details = list()
+
+	def event_loop(self):
+		pass
+
+	def update(self):
+		self.updates += 1
+
+	def render(self):
+		self.per_frame.append(self.updates - sum(self.per_frame))
+		self.done = len(self.per_frame) == self.frames
+
+	def set_detail(self, detail):
+		self.details.append(detail)
+
+def run(frames, **kwargs):
+	app = FakeApp(len(frames))
+	# 50 fps makes the step a round 20 ms.
+	pacer = FramePacer(50, clock=FakeClock(frames), **kwargs)
+	pacer.run(app)
+	return app, pacer
+
+def test_on_time_frames_update_once():
+	app, pacer = run([(20, 10)] * 10)
+	assert app.per_frame == [1] * 10
+	assert (pacer.frames, pacer.updates, pacer.skipped, pacer.dropped) == (10, 10, 0, 0)
+
+def test_slow_frame_is_caught_up_before_next_render():
+	app, pacer = run([(60, 10), (20, 10), (20, 10)])
+	assert app.per_frame == [1, 3, 1]
+	assert (pacer.updates, pacer.skipped, pacer.dropped) == (5, 2, 0)
+
+def test_updates_past_max_skip_are_dropped():
+	app, pacer = run([(200, 10), (20, 10), (20, 10)], max_skip=4)
+	assert app.per_frame == [1, 5, 1]
+	assert (pacer.updates, pacer.skipped, pacer.dropped) == (7, 4, 5)
+
+def test_detail_drops_while_slow_and_recovers_when_fast():
+	slow = [(20, 30)] * FramePacer.SLOW_FRAMES
+	fast = [(20, 5)] * FramePacer.FAST_FRAMES
+	app, pacer = run(slow + fast)
+	assert app.details == [1, 0]
+	assert pacer.detail == 0
+	assert pacer.detail_changes == 2
+
+def test_detail_stops_at_max():
+	app, pacer = run([(20, 30)] * FramePacer.SLOW_FRAMES * 5)
+	assert app.details == list(range(1, FramePacer.MAX_DETAIL + 1))
+
+def test_fixed_detail_without_adaptive():
+	app, pacer = run([(20, 30)] * FramePacer.SLOW_FRAMES * 2, adaptive=False)
+	assert app.details == list()
@@ -0,0 +1,20 @@
+import pong
+from game_runner import publish
+from replay_log import LogReader, LogWriter
+
+def test_update_publishes_telemetry_to_log(boot, tmp_path):
+	path = str(tmp_path / "pong.log")
+	log = LogWriter(path)
+	app = boot(pong, log=log)
+	for i in range(3):
+		app.update()
+	log.close()
+
+	reader = LogReader(path)
+	assert [tick for tick, values in reader] == [0, 1, 2]
+	reader.close()
+
+def test_publish_without_outputs_skips_telemetry(boot):
+	app = boot(pong)
+	app.telemetry = None
+	publish(app)
@@ -0,0 +1,101 @@
+"""
+Ticks per second of fixed scenarios, checked against perf_baseline.json.
+
+Set PERF_UPDATE_BASELINE=1 to record new baselines for this machine and
+PERF_THRESHOLD to change the allowed slowdown (0.5 allows half the speed).
+"""
+
+import os
+import json
+import time
+import random
+
+import pytest
+
+import avoid_the_dots
+import flappybox
+import pong
+import pong4p
+from conftest import Keys
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf_baseline.json")
+THRESHOLD = float(os.environ.get("PERF_THRESHOLD", "0.5"))
+TICKS = 600
+RUNS = 3
+
+def avoid_the_dots_scenario(boot):
+	app = boot(avoid_the_dots)
+	app.keys = Keys(avoid_the_dots.pg.K_LEFT)
+	return app, app.update
+
+def flappybox_scenario(boot):
+	app = boot(flappybox, course=flappybox.Course(1))
+	def step():
+		app.game_started = True
+		app.keys = Keys(flappybox.TRIGGER) if app.tick % 20 == 0 else Keys()
+		app.update()
+	return app, step
+
+def pong_scenario(boot):
+	app = boot(pong, controllers=pong.ai_controllers())
+	return app, app.update
+
+def pong4p_scenario(boot):
+	app = boot(pong4p, controllers=pong4p.ai_controllers())
+	return app, app.update
+
+SCENARIOS = {
+	"avoid_the_dots": avoid_the_dots_scenario,
+	"flappybox": flappybox_scenario,
+	"pong": pong_scenario,
+	"pong4p": pong4p_scenario,
+}
+
+def ticks_per_second(app, step):
+	"""
+	Runs the scenario from the same snapshot RUNS times and returns the
+	best rate, to keep noise from other processes out.
+	"""
+	start_state = app.snapshot()
+	best = None
+	for run in range(RUNS):
+		app.restore(start_state)
+		random.seed(0)
+		start = time.perf_counter()
+		for i in range(TICKS):
+			step()
+			app.render()
+		elapsed = time.perf_counter() - start
+		best = elapsed if best is None else min(best, elapsed)
+	return TICKS / best
+
+def load_baseline():
+	if not os.path.exists(BASELINE):
+		return dict()
+	with open(BASELINE) as f:
+		return json.load(f)
+
+@pytest.mark.parametrize("name", sorted(SCENARIOS))
+def test_ticks_per_second(boot, name):
+	app, step = SCENARIOS[name](boot)
+	tps = ticks_per_second(app, step)
+
+	baseline = load_baseline()
+	if os.environ.get("PERF_UPDATE_BASELINE"):
+		baseline[name] = round(tps)
+		with open(BASELINE, "w") as f:
+			json.dump(baseline, f, indent=1, sort_keys=True)
+		return
+	if name not in baseline:
+		pytest.skip("No baseline for %s, run with PERF_UPDATE_BASELINE=1" % name)
+
+	assert tps >= baseline[name] * (1 - THRESHOLD), \
+		"%s ran at %d ticks/s, baseline is %d" % (name, tps, baseline[name])
+
+def test_pong4p_snapshot_restore_under_a_millisecond(boot):
+	app = boot(pong4p)
+	count = 1000
+	start = time.perf_counter()
+	for i in range(count):
+		app.restore(app.snapshot())
+	assert (time.perf_counter() - start) / count < 0.001
@@ -0,0 +1,54 @@
+import random
+
+import pong
+from conftest import Keys
+
+def test_ball_out_left_scores_right(boot):
+	app = boot(pong)
+	app.ball.rect.x = -1
+	app.check_collision(app.ball)
+	assert (app.sl.score, app.sr.score) == (0, 1)
+	assert app.ball.rect.center == app.ball.o_pos
+
+def test_ball_out_right_scores_left(boot):
+	app = boot(pong)
+	app.ball.rect.x = app.screen_rect.width + 1
+	app.check_collision(app.ball)
+	assert (app.sl.score, app.sr.score) == (1, 0)
+
+def test_keyboard_moves_paddle(boot):
+	app = boot(pong)
+	y = app.pl.rect.y
+	app.keys = Keys(pong.CONTROLS[pong.PL][pong.DN])
+	app.update()
+	assert app.pl.rect.y == y + pong.PADSPEED
+
+def test_ball_bounces_off_paddle(boot):
+	app = boot(pong)
+	app.ball.rect.midright = app.pr.rect.midleft
+	app.ball.update(app.screen_rect, app.pl.rect, app.pr.rect)
+	assert app.ball.vel[0] == -1
+	assert app.ball.bounces == 1
+
+def test_ai_paddles_keep_the_ball_in_play(boot):
+	app = boot(pong, controllers=pong.ai_controllers())
+	for i in range(3000):
+		app.update()
+	assert (app.sl.score, app.sr.score) == (0, 0)
+
+def test_snapshot_restore_replays_identically(boot):
+	app = boot(pong)
+	for i in range(200):
+		app.update()
+	snapshot = app.snapshot()
+
+	random.seed(0)
+	for i in range(300):
+		app.update()
+	expected = app.snapshot()
+
+	app.restore(snapshot)
+	random.seed(0)
+	for i in range(300):
+		app.update()
+	assert app.snapshot() == expected
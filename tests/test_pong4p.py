@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+import pong4p
+
+@pytest.mark.parametrize("pos, scores", [
+	((-1, 300), (0, 1, 1, 1)),
+	((800, 300), (1, 0, 1, 1)),
+	((300, 800), (1, 1, 1, 0)),
+	((300, -1), (1, 1, 0, 1)),
+])
+def test_ball_out_scores_other_players(boot, pos, scores):
+	app = boot(pong4p)
+	app.ball.rect.topleft = pos
+	app.check_collision()
+	assert (app.sl.score, app.sr.score, app.st.score, app.sb.score) == scores
+	assert app.ball.rect.center == app.ball.o_pos
+
+def test_ball_bounces_away_from_paddle(boot):
+	app = boot(pong4p)
+	app.ball.vel = (1, -1)
+	app.ball.rect.midbottom = app.pt.rect.midbottom
+	app.check_collision()
+	assert app.ball.vel == (1, 1)
+	app.check_collision()
+	assert app.ball.vel == (1, 1)
+	assert app.ball.bounces == 1
+
+def test_ai_paddles_keep_the_ball_in_play(boot):
+	app = boot(pong4p, controllers=pong4p.ai_controllers())
+	for i in range(3000):
+		app.update()
+	assert (app.sl.score, app.sr.score, app.st.score, app.sb.score) == (0, 0, 0, 0)
+
+def test_snapshot_restore_replays_identically(boot):
+	app = boot(pong4p)
+	for i in range(200):
+		app.update()
+	snapshot = app.snapshot()
+
+	random.seed(0)
+	for i in range(300):
+		app.update()
+	expected = app.snapshot()
+
+	app.restore(snapshot)
+	random.seed(0)
+	for i in range(300):
+		app.update()
+	assert app.snapshot() == expected
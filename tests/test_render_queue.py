@@ -0,0 +1,64 @@
+import pygame as pg
+import pytest
+
+import avoid_the_dots
+import flappybox
+import pong
+import pong4p
+import render_queue
+
+GAMES = [avoid_the_dots, flappybox, pong, pong4p]
+
+def test_flush_keeps_submission_order(boot):
+	app = boot(pong)
+	red = pg.Surface((10, 10))
+	red.fill(pg.Color("red"))
+	blue = pg.Surface((10, 10))
+	blue.fill(pg.Color("blue"))
+
+	queue = render_queue.RenderQueue()
+	queue.add([(red, (0, 0)), (blue, (5, 5)), (red, (10, 10))])
+	dirty = list()
+	queue.flush(app.screen, dirty)
+	assert app.screen.get_at((7, 7)) == pg.Color("blue")
+	assert app.screen.get_at((12, 12)) == pg.Color("red")
+	assert len(dirty) == 3
+	assert queue.layers == list()
+
+@pytest.mark.parametrize("module", GAMES)
+def test_texture_path_matches_software_path(boot, monkeypatch, module):
+	monkeypatch.setenv("SDL_RENDER_DRIVER", "software")
+	app = boot(module)
+	queue = render_queue.create_display(module.SCREEN_SIZE, True)
+	if not isinstance(queue, render_queue.TextureRenderQueue):
+		pytest.skip("no SDL renderer available")
+	app.screen = pg.display.get_surface()
+	for i in range(60):
+		app.update()
+	if module is avoid_the_dots:
+		app.player.health = 0
+		for i in range(5):
+			app.update()
+
+	# Read back before present(), which may discard the back buffer.
+	monkeypatch.setattr(queue, "present", queue.flush)
+	app.render_queue = queue
+	app.render()
+	hardware = pg.image.tostring(queue.renderer.to_surface(), "RGB")
+
+	monkeypatch.setattr(pg.display, "update", lambda: None)
+	app.render_queue = render_queue.RenderQueue()
+	app.render()
+	software = pg.image.tostring(app.screen, "RGB")
+
+	assert len(hardware) == len(software)
+	# Antialiased text edges can round one level apart between pygame's
+	# alpha blitter and SDL's; everything else must match exactly.
+	assert max(abs(a - b) for a, b in zip(hardware, software)) <= 1
+
+@pytest.mark.parametrize("module", GAMES)
+def test_window_close_ends_the_game(boot, module):
+	app = boot(module)
+	pg.event.post(pg.event.Event(render_queue.QUIT_EVENTS[-1]))
+	app.event_loop()
+	assert app.done
@@ -0,0 +1,76 @@
+import os
+
+import pytest
+
+from replay_log import LogReader, LogWriter, key_bits
+
+def write_log(path, ticks, flush=True):
+	log = LogWriter(str(path))
+	for tick in ticks:
+		log.write(tick, [tick, -tick, tick * 2])
+	if flush:
+		log.close()
+	return log
+
+def test_round_trip(tmp_path):
+	write_log(tmp_path / "game.log", range(100))
+	log = LogReader(str(tmp_path / "game.log"))
+	assert len(log) == 100
+	assert list(log) == [(t, (t, -t, t * 2)) for t in range(100)]
+	log.close()
+
+def test_seek(tmp_path):
+	write_log(tmp_path / "game.log", range(0, 200, 2))
+	log = LogReader(str(tmp_path / "game.log"))
+	assert log.read(50) == (50, -50, 100)
+	assert next(log.iter_from(51))[0] == 52
+	assert list(log.iter_from(1000)) == list()
+	with pytest.raises(KeyError):
+		log.read(51)
+	log.close()
+
+def test_crash_tail_is_recovered(tmp_path):
+	path = str(tmp_path / "game.log")
+	write_log(path, range(100))
+	# Lose the last 40 index entries and half of the last record, as if
+	# the game died between flushes.
+	with open(path + ".idx", "r+b") as index:
+		index.truncate(os.path.getsize(path + ".idx") - 40 * 12 - 5)
+	with open(path, "r+b") as data:
+		data.truncate(os.path.getsize(path) - 6)
+
+	log = LogReader(path)
+	assert log.count == 59
+	assert len(log) == 99
+	assert log.read(98) == (98, -98, 196)
+	with pytest.raises(KeyError):
+		log.read(99)
+	log.close()
+
+def test_new_session_replaces_log(tmp_path):
+	path = str(tmp_path / "game.log")
+	write_log(path, range(100))
+	write_log(path, range(10))
+	log = LogReader(path)
+	assert len(log) == 10
+	assert log.read(5) == (5, -5, 10)
+	log.close()
+
+def test_unflushed_log_reads_empty(tmp_path):
+	path = str(tmp_path / "game.log")
+	writer = write_log(path, range(10), flush=False)
+	log = LogReader(path)
+	assert len(log) == 0
+	assert list(log) == list()
+	log.close()
+	writer.close()
+
+def test_other_files_are_rejected(tmp_path):
+	path = tmp_path / "game.log"
+	path.write_bytes(b"not a log")
+	with pytest.raises(ValueError):
+		LogReader(str(path))
+
+def test_key_bits():
+	keys = {1: True, 2: False, 3: True}
+	assert key_bits(keys, (1, 2, 3)) == 0b101